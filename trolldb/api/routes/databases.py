@@ -55,7 +55,7 @@ async def collection_names(db: CheckDataBaseDependency) -> list[str]:
             summary="Gets the object ids of all documents for the given database and collection name")
 async def documents(collection: CheckCollectionDependency) -> list[str]:
     """Please consult the auto-generated documentation by FastAPI."""
-    return await get_ids(collection.find({}))
+    return await get_ids(collection.find({}, projection={"_id": 1}))
 
 
 @router.get("/{database_name}/{collection_name}/{_id}",
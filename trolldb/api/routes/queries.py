@@ -43,4 +43,4 @@ async def queries(
                 ((start_time >= time_min) & (start_time <= time_max)) |
                 ((end_time >= time_min) & (end_time <= time_max))
         )
-    return await get_ids(collection.aggregate(pipelines))
+    return await get_ids(collection.aggregate([*pipelines, {"$project": {"_id": 1}}]))
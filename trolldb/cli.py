@@ -44,7 +44,8 @@ async def record_messages(config: AppConfig) -> None:
             config.database.main_database_name, config.database.main_collection_name
         )
         for m in create_subscriber_from_dict_config(config.subscriber).recv():
-            msg = Message.decode(str(m))
+            # The subscriber yields decoded messages, so there is no need to encode and then decode them again.
+            msg = m if isinstance(m, Message) else Message.decode(str(m))
             match msg.type:
                 case "file":
                     await collection.insert_one(msg.data)
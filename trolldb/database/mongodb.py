@@ -71,8 +71,11 @@ async def get_ids(docs: Union[AsyncIOMotorCommandCursor, AsyncIOMotorCursor]) ->
 
     Returns:
         The list of all IDs, each as a simple string.
+
+    Note:
+        The documents are retrieved in batches via ``to_list()``, instead of awaiting them one by one via ``async for``.
     """
-    return [str(doc["_id"]) async for doc in docs]
+    return [str(doc["_id"]) for doc in await docs.to_list(None)]
 
 
 class MongoDB:
@@ -10,8 +10,10 @@ class PipelineBooleanDict(dict):
 
     The operators are only defined for operands of type :class:`PipelineBooleanDict`. For each of the aforementioned
     operators, the result will be a dictionary with a single key/value pair. The key is either ``$or`` or ``$and``
-    depending on the operator being used. The corresponding value is a list with two elements only. The first element
-    of the list is the content of the left operand and the second element is the content of the right operand.
+    depending on the operator being used. The corresponding value is a list whose first element is the content of the
+    left operand and whose second element is the content of the right operand. However, an operand which is itself the
+    result of the same operator is not nested, but its elements are included instead. As a result, chaining the same
+    operator, e.g. ``pd1 & pd2 & pd3``, gives a flat list of three elements.
 
     Example:
         .. code-block:: python
@@ -28,15 +30,26 @@ class PipelineBooleanDict(dict):
             pd_or_literal = PipelineBooleanDict({"$or": [{"number": 2}, {"kind": 1}]})
             # The following evaluates to True
             pd_or == pd_or_literal
+
+            pd_and_chain = pd1 & pd2 & PipelineBooleanDict({"size": 3})
+            pd_and_chain_literal = PipelineBooleanDict({"$and": [{"number": 2}, {"kind": 1}, {"size": 3}]})
+            # The following evaluates to True
+            pd_and_chain == pd_and_chain_literal
     """
 
+    def __operands(self, operator: str) -> list:
+        """An auxiliary function to get the operands of the given operator, so that its results are not nested."""
+        if list(self.keys()) == [operator]:
+            return self[operator]
+        return [self]
+
     def __or__(self, other: Self) -> Self:
         """Implements the bitwise or operator, i.e. ``|``."""
-        return PipelineBooleanDict({"$or": [self, other]})
+        return PipelineBooleanDict({"$or": [*self.__operands("$or"), *other.__operands("$or")]})
 
     def __and__(self, other: Self) -> Self:
         """Implements the bitwise and operator, i.e. ``&``."""
-        return PipelineBooleanDict({"$and": [self, other]})
+        return PipelineBooleanDict({"$and": [*self.__operands("$and"), *other.__operands("$and")]})
 
 
 class PipelineAttribute:
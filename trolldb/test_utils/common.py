@@ -1,26 +1,39 @@
 """Common functionalities for testing, shared between tests and other test utility modules."""
 
+import json
+import os
 import time
 from contextlib import contextmanager
-from multiprocessing import Process
+from multiprocessing import get_context
+from multiprocessing.process import BaseProcess
 from typing import Any, Generator, Optional
 from urllib.parse import urljoin
 
-import yaml
+from loguru import logger
 from pydantic import AnyUrl, FilePath
 from urllib3 import BaseHTTPResponse, request
+from urllib3.exceptions import HTTPError
 
 from trolldb.api.api import run_server
 from trolldb.config.config import AppConfig, Timeout
 
+worker_index: int = int(os.environ.get("PYTEST_XDIST_WORKER", "gw0").removeprefix("gw"))
+"""The index of the ``pytest-xdist`` worker which runs the tests, or zero if the tests are not distributed.
 
-def make_test_app_config_as_dict(subscriber_address: Optional[FilePath] = None) -> dict[str, dict]:
+It offsets the ports of the test MongoDB instance and of the API server, so that each worker runs its own instances.
+"""
+
+
+def make_test_app_config_as_dict(
+        subscriber_address: Optional[FilePath] = None, database_name: str = "test_database") -> dict[str, dict]:
     """Makes the app configuration (as a dictionary) when used in testing.
 
     Args:
         subscriber_address:
             The address of the subscriber if it is of type ``FilePath``. Otherwise, if it is ``None`` the ``subscriber``
             config will be an empty dictionary.
+        database_name:
+            The name of the main database. Defaults to ``"test_database"``.
 
     Returns:
         A dictionary with a structure similar to that of an :obj:`~trolldb.config.config.AppConfig` object.
@@ -32,12 +45,12 @@ def make_test_app_config_as_dict(subscriber_address: Optional[FilePath] = None)
     """
     app_config = dict(
         api_server=dict(
-            url="http://localhost:8080"
+            url=f"http://localhost:{8080 + worker_index}"
         ),
         database=dict(
-            main_database_name="test_database",
+            main_database_name=database_name,
             main_collection_name="test_collection",
-            url="mongodb://localhost:28017",
+            url=f"mongodb://localhost:{28017 + worker_index}",
             timeout=1
         ),
         subscriber=dict(
@@ -54,11 +67,16 @@ test_app_config = AppConfig(**make_test_app_config_as_dict())
 """The app configs for testing purposes assuming an empty configuration for the subscriber."""
 
 
-def create_config_file(config_path: FilePath) -> FilePath:
-    """Creates a config file for tests."""
+def create_config_file(config_path: FilePath, database_name: str = "test_database") -> FilePath:
+    """Creates a config file for tests.
+
+    Note:
+        The configurations are written in JSON, which is also valid YAML. This is because the JSON encoder is much
+        faster than the YAML emitter, while the file can still be parsed by :func:`~trolldb.config.config.parse_config`.
+    """
     config_file = config_path / "config.yaml"
     with open(config_file, "w") as f:
-        yaml.safe_dump(make_test_app_config_as_dict(config_path), f)
+        json.dump(make_test_app_config_as_dict(config_path, database_name), f)
     return config_file
 
 
@@ -77,6 +95,28 @@ def http_get(route: str = "", root: AnyUrl = test_app_config.api_server.url) ->
     return request("GET", urljoin(root.unicode_string(), route))
 
 
+def wait_until_api_server_ready(root: AnyUrl, startup_time: Timeout) -> bool:
+    """Waits until the API server responds to a GET request on its root, but not longer than ``startup_time``.
+
+    Args:
+        root:
+            The root URL of the API server.
+        startup_time:
+            The maximum time in seconds to wait for the server.
+
+    Returns:
+        Whether the server is ready to accept requests.
+    """
+    deadline = time.monotonic() + startup_time
+    while time.monotonic() < deadline:
+        try:
+            request("GET", root.unicode_string(), retries=False, timeout=0.1)
+            return True
+        except HTTPError:
+            time.sleep(0.01)
+    return False
+
+
 def compare_by_operator_name(operator: str, left: Any, right: Any) -> Any:
     """Compares two operands given the binary operator name in a string format.
 
@@ -114,7 +154,7 @@ def compare_by_operator_name(operator: str, left: Any, right: Any) -> Any:
 
 @contextmanager
 def api_server_process_context(
-        config: AppConfig = test_app_config, startup_time: Timeout = 2) -> Generator[Process, Any, None]:
+        config: AppConfig = test_app_config, startup_time: Timeout = 5) -> Generator[BaseProcess, Any, None]:
     """A synchronous context manager to run the API server in a separate process (non-blocking).
 
     It uses the `multiprocessing <https://docs.python.org/3/library/multiprocessing.html>`_ package. The main use case
@@ -125,14 +165,20 @@ def api_server_process_context(
             Same as ``config`` argument for :func:`run_server`.
 
         startup_time:
-            The overall time in seconds that is expected for the server and the database connections to be established
-            before actual requests can be sent to the server. For testing purposes ensure that this is sufficiently
-            large so that the tests will not time out.
+            The maximum time in seconds that is expected for the server and the database connections to be established
+            before actual requests can be sent to the server. The context manager yields as soon as the server
+            responds, which is usually much sooner.
+
+    Note:
+        The server process is spawned, rather than forked. As a result, it starts from a clean interpreter and does not
+        inherit e.g. an already initialized :class:`~trolldb.database.mongodb.MongoDB` client or the MongoDB clients of
+        the tests, together with their background threads, from the parent process.
     """
-    process = Process(target=run_server, args=(config,))
+    process = get_context("spawn").Process(target=run_server, args=(config,))
     try:
         process.start()
-        time.sleep(startup_time)
+        if not wait_until_api_server_ready(config.api_server.url, startup_time):
+            logger.warning(f"The API server did not respond within {startup_time} seconds!")
         yield process
     finally:
         process.terminate()
@@ -1,15 +1,35 @@
 """The module which provides testing utilities to make MongoDB databases/collections and fill them with test data."""
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime, timedelta
-from random import choices, randint, shuffle
-from typing import Any, ClassVar, Generator
+from functools import cache, partial
+from random import Random
+from threading import Lock
+from typing import Any, ClassVar, Generator, Optional, Self
 
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING, DeleteMany, IndexModel, InsertOne, MongoClient
+from pymongo.collection import Collection
 
 from trolldb.config.config import DatabaseConfig
 from trolldb.test_utils.common import test_app_config
 
+_clients: dict[tuple[str, float], MongoClient] = {}
+"""The MongoDB clients which are shared by all :func:`mongodb_for_test_context` calls, keyed by the URL and timeout."""
+
+_clients_lock = Lock()
+"""The lock which guards :obj:`_clients`, as :func:`mongodb_for_test_context` is also called from worker threads."""
+
+
+@atexit.register
+def _close_clients() -> None:
+    """Closes all shared MongoDB clients when the interpreter exits."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
 
 @contextmanager
 def mongodb_for_test_context(
@@ -20,6 +40,11 @@ def mongodb_for_test_context(
         This is based on `Pymongo` and not the `motor` async driver. For testing purposes this is sufficient, and we
         do not need async capabilities.
 
+    Note:
+        The client is created on first use for each database configuration and is then shared by all subsequent calls.
+        It is not closed when the context manager exits, so that its connection pool stays warm. Instead, all shared
+        clients are closed when the interpreter exits.
+
     Args:
         database_config (Optional, default :obj:`test_app_config.database`):
             The configuration object for the database.
@@ -28,79 +53,97 @@ def mongodb_for_test_context(
         MongoClient:
             The MongoDB client object (from `Pymongo`)
     """
-    client = None
-    try:
-        client = MongoClient(database_config.url.unicode_string(), connectTimeoutMS=database_config.timeout * 1000)
-        yield client
-    finally:
-        if client is not None:
-            client.close()
+    key = (database_config.url.unicode_string(), database_config.timeout)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = MongoClient(key[0], connectTimeoutMS=database_config.timeout * 1000)
+        client = _clients[key]
+    yield client
 
 
-class Time:
-    """A static class to enclose functionalities for generating random timestamps."""
+random_seed: int = 1904
+"""The seed of :obj:`rng`, so that the same test data is generated in every run and failures can be reproduced."""
 
-    min_start_time: ClassVar[datetime] = datetime(2019, 1, 1, 0, 0, 0)
-    """The minimum timestamp which is allowed to appear in our data."""
+# We suppress ruff (S311) here as we are not generating anything cryptographic here!
+rng: Random = Random(random_seed)  # noqa: S311
+"""The random number generator which is used to generate all the test data."""
 
-    max_end_time: ClassVar[datetime] = datetime(2024, 1, 1, 0, 0, 0)
-    """The maximum timestamp which is allowed to appear in our data."""
+min_start_time: datetime = datetime(2019, 1, 1, 0, 0, 0)
+"""The minimum timestamp which is allowed to appear in our data."""
 
-    delta_time: ClassVar[int] = int((max_end_time - min_start_time).total_seconds())
-    """The difference between the maximum and minimum timestamps in seconds."""
+max_end_time: datetime = datetime(2024, 1, 1, 0, 0, 0)
+"""The maximum timestamp which is allowed to appear in our data."""
 
-    @staticmethod
-    def random_interval_secs(max_interval_secs: int) -> timedelta:
-        """Generates a random time interval between zero and the given max interval in seconds."""
-        # We suppress ruff (S311) here as we are not generating anything cryptographic here!
-        return timedelta(seconds=randint(0, max_interval_secs))  # noqa: S311
+delta_time: int = int((max_end_time - min_start_time).total_seconds())
+"""The difference between the maximum and minimum timestamps in seconds."""
 
-    @staticmethod
-    def random_start_time() -> datetime:
-        """Generates a random start time.
-
-        The start time has a lower bound which is specified by :obj:`~Time.min_start_time` and an upper bound given by
-        :obj:`~Time.max_end_time`.
-        """
-        return Time.min_start_time + Time.random_interval_secs(Time.delta_time)
 
-    @staticmethod
-    def random_end_time(start_time: datetime, max_interval_secs: int = 300) -> datetime:
-        """Generates a random end time.
+def random_intervals_secs(max_interval_secs: int, k: int) -> list[timedelta]:
+    """Generates ``k`` random time intervals, each between zero and the given max interval in seconds.
 
-        The end time is within ``max_interval_secs`` seconds from the given ``start_time``. By default, the interval
-        is set to 300 seconds (5 minutes).
-        """
-        return start_time + Time.random_interval_secs(max_interval_secs)
+    The intervals are drawn via a single call to :obj:`rng` instead of one call per interval. This only saves the
+    overhead of the calls, as ``rng.choices`` still draws the samples one at a time in Python.
+    """
+    return [timedelta(seconds=s) for s in rng.choices(range(max_interval_secs + 1), k=k)]
 
 
 class Document:
     """A class which defines functionalities to generate database documents/data which are similar to real data."""
 
-    def __init__(self, platform_name: str, sensor: str) -> None:
-        """Initializes the document given its platform and sensor names."""
+    max_dataset_size: ClassVar[int] = 30
+    """The maximum number of items in the dataset of a document."""
+
+    def __init__(
+            self,
+            platform_name: str,
+            sensor: str,
+            start_time: datetime,
+            end_time: datetime,
+            dataset_size: int) -> None:
+        """Initializes the document given its platform and sensor names, its start and end times, and its dataset size.
+
+        Note:
+            The documents are meant to be generated via :func:`Document.batch`, which draws the random values.
+        """
         self.platform_name = platform_name
         self.sensor = sensor
-        self.start_time = Time.random_start_time()
-        self.end_time = Time.random_end_time(self.start_time)
+        self.start_time = start_time
+        self.end_time = end_time
+        self.dataset_size = dataset_size
+
+    @classmethod
+    def batch(cls, platform_names: list[str], sensors: list[str]) -> list[Self]:
+        """Generates one document for each pair of platform and sensor names.
+
+        The start time of each document lies between :obj:`min_start_time` and :obj:`max_end_time`, its end time is
+        within 300 seconds (5 minutes) from its start time, and its dataset size is between 1 and
+        :obj:`Document.max_dataset_size`. Each of the three is drawn for all documents at once, in the same way as in
+        :func:`random_intervals_secs`.
+        """
+        n = min(len(platform_names), len(sensors))
+        start_times = [min_start_time + dt for dt in random_intervals_secs(delta_time, n)]
+        end_times = [t + dt for t, dt in zip(start_times, random_intervals_secs(300, n), strict=True)]
+        dataset_sizes = rng.choices(range(1, cls.max_dataset_size + 1), k=n)
+        return [
+            cls(*args) for args in zip(platform_names, sensors, start_times, end_times, dataset_sizes, strict=False)
+        ]
 
-    def generate_dataset(self, max_count: int) -> list[dict]:
+    def generate_dataset(self) -> list[dict]:
         """Generates the dataset for a given document.
 
         This corresponds to the list of files which are stored in each document. The number of items in a dataset is
-        randomly chosen from 1 to ``max_count`` for each document.
+        given by :obj:`Document.dataset_size`, which is randomly chosen from 1 to :obj:`Document.max_dataset_size` for
+        each document.
         """
-        dataset = []
-        # We suppress ruff (S311) here as we are not generating anything cryptographic here!
-        n = randint(1, max_count)  # noqa: S311
-        for i in range(n):
-            txt = f"{self.platform_name}_{self.sensor}_{self.start_time}_{self.end_time}_{i}"
-            dataset.append({
-                "uri": f"/pytroll/{txt}",
-                "uid": f"{txt}.EXT1",
-                "path": f"{txt}.EXT1.EXT2"
-            })
-        return dataset
+        prefix = f"{self.platform_name}_{self.sensor}_{self.start_time}_{self.end_time}_"
+        return [
+            {
+                "uri": f"/pytroll/{prefix}{i}",
+                "uid": f"{prefix}{i}.EXT1",
+                "path": f"{prefix}{i}.EXT1.EXT2"
+            }
+            for i in range(self.dataset_size)
+        ]
 
     def like_mongodb_document(self) -> dict:
         """Returns a dictionary which resembles the format we have for our real data when saving them to MongoDB."""
@@ -109,7 +152,7 @@ class Document:
             "sensor": self.sensor,
             "start_time": self.start_time,
             "end_time": self.end_time,
-            "dataset": self.generate_dataset(30)
+            "dataset": self.generate_dataset()
         }
 
 
@@ -119,26 +162,26 @@ class TestDatabase:
     unique_platform_names: ClassVar[list[str]] = ["PA", "PB", "PC"]
     """The unique platform names that will be used to generate the sample of all platform names."""
 
-    # We suppress ruff (S311) here as we are not generating anything cryptographic here!
-    platform_names: ClassVar[list[str]] = choices(["PA", "PB", "PC"], k=20)  # noqa: S311
-    """Example platform names.
-
-    Warning:
-        The value of this variable changes randomly every time. What you see above is just an example which has been
-        generated as a result of building the documentation!
-    """
-
     unique_sensors: ClassVar[list[str]] = ["SA", "SB", "SC"]
     """The unique sensor names that will be used to generate the sample of all sensor names."""
 
-    # We suppress ruff (S311) here as we are not generating anything cryptographic here!
-    sensors: ClassVar[list[str]] = choices(["SA", "SB", "SC"], k=20)  # noqa: S311
-    """Example sensor names.
+    @classmethod
+    @cache
+    def platform_names(cls) -> list[str]:
+        """Example platform names.
+
+        The sample is drawn from :obj:`rng` on first access and then cached, so that it does not run at import time.
+        """
+        return rng.choices(cls.unique_platform_names, k=20)
 
-    Warning:
-        The value of this variable changes randomly every time. What you see above is just an example which has been
-        generated as a result of building the documentation!
-    """
+    @classmethod
+    @cache
+    def sensors(cls) -> list[str]:
+        """Example sensor names.
+
+        The sample is drawn from :obj:`rng` on first access and then cached, so that it does not run at import time.
+        """
+        return rng.choices(cls.unique_sensors, k=20)
 
     database_names: ClassVar[list[str]] = [test_app_config.database.main_database_name, "another_test_database"]
     """List of all database names.
@@ -157,158 +200,197 @@ class TestDatabase:
     all_database_names: ClassVar[list[str]] = ["admin", "config", "local", *database_names]
     """All database names including the default ones which are automatically created by MongoDB."""
 
+    indexed_fields: ClassVar[list[str]] = ["uri", "dataset.uri", "scan_mode"]
+    """The fields which are indexed in the collections of the leased databases, i.e. the ones the recorder tests use.
+
+    These are the ones which are used to delete documents by URI, and to find the recorded messages in tests. The
+    collections with the test data are not indexed, as none of these lookups is made there.
+    """
+
     documents: ClassVar[list[dict]] = []
     """The list of documents which include test data."""
 
+    _cache: ClassVar[dict[str | tuple, Any]] = dict()
+    """The results of the queries on the test data which have been made since the test data was last modified.
+
+    The keys are the names of the methods which made the queries, or tuples of the method name and its arguments for
+    the methods which take any.
+    """
+
+    _fingerprint: ClassVar[Optional[tuple]] = None
+    """The state of the databases as left by the last call to :func:`TestDatabase.prepare`, if any."""
+
     @classmethod
-    def generate_documents(cls, random_shuffle: bool = True) -> None:
+    def main_collection(cls, client: MongoClient) -> Collection:
+        """Returns the main collection, i.e. the one which includes the test data, using the given client."""
+        return client[cls.database_names[0]][cls.collection_names[0]]
+
+    @classmethod
+    def create_indexes(cls, collection: Collection) -> None:
+        """Creates the indexes of :obj:`TestDatabase.indexed_fields` in the given collection, if they do not exist."""
+        collection.create_indexes([IndexModel(field) for field in cls.indexed_fields])
+
+    @classmethod
+    def generate_documents(cls) -> None:
         """Generates test documents which for practical purposes resemble real data.
 
+        Note:
+            The documents are not shuffled, as their order is already random. This is because the platform and sensor
+            names are random samples, and so are the times.
+
         Warning:
             This method is not pure! The side effect is that the :obj:`TestDatabase.documents` is reset to new values.
         """
         cls.documents = [
-            Document(p, s).like_mongodb_document() for p, s in zip(cls.platform_names, cls.sensors, strict=False)
+            document.like_mongodb_document() for document in Document.batch(cls.platform_names(), cls.sensors())
         ]
-        if random_shuffle:
-            shuffle(cls.documents)
 
     @classmethod
     def reset(cls) -> None:
         """Resets all the databases/collections.
 
-        This is done by deleting all documents in the collections and then inserting a single empty document, i.e.
-        ``{}``, in them.
+        This is done by dropping the collections and then explicitly creating them again, so that they exist but are
+        empty. This avoids inserting a stub document, i.e. ``{}``, to make MongoDB create the collections.
         """
-        with mongodb_for_test_context() as client:
-            for db_name, coll_name in zip(cls.database_names, cls.collection_names, strict=False):
-                db = client[db_name]
-                collection = db[coll_name]
-                collection.delete_many({})
-                collection.insert_one({})
+        cls._cache.clear()
+        with mongodb_for_test_context() as client, ThreadPoolExecutor() as executor:
+            # The collections are independent of each other, hence they are reset concurrently. Note that we consume
+            # the results so that exceptions raised in the worker threads propagate.
+            list(executor.map(partial(cls._reset_collection, client), cls.database_names, cls.collection_names))
+
+    @classmethod
+    def _reset_collection(cls, client: MongoClient, database_name: str, collection_name: str) -> None:
+        """An auxiliary method to :func:`TestDatabase.reset` which resets a single collection."""
+        database = client[database_name]
+        database.drop_collection(collection_name)
+        database.create_collection(collection_name)
 
     @classmethod
     def write_test_data(cls) -> None:
         """Fills databases/collections with test data."""
+        cls._cache.clear()
         with mongodb_for_test_context() as client:
             # The following function call has side effects!
             cls.generate_documents()
-            collection = client[
-                test_app_config.database.main_database_name
-            ][
-                test_app_config.database.main_collection_name
-            ]
-            collection.delete_many({})
-            collection.insert_many(cls.documents)
+            collection = cls.main_collection(client)
+            # The deletion must precede the insertions, hence the bulk write must be ordered.
+            collection.bulk_write([DeleteMany({}), *(InsertOne(document) for document in cls.documents)], ordered=True)
 
     @classmethod
-    def get_documents_from_database(cls) -> list[dict]:
-        """Retrieves all the documents from the database.
+    def get_document_ids_from_database(cls) -> list[str]:
+        """Retrieves all the document IDs from the database.
 
-        Returns:
-            A list of all documents from the database. This matches the content of :obj:`~TestDatabase.documents` with
-            the addition of `IDs` which are assigned by the MongoDB.
+        Only the ``_id`` field is fetched, so that the ``dataset`` arrays of the documents are not transferred. The IDs
+        are cached until the test data is modified.
         """
-        with mongodb_for_test_context() as client:
-            collection = client[
-                test_app_config.database.main_database_name
-            ][
-                test_app_config.database.main_collection_name
-            ]
-            documents = list(collection.find({}))
-        return documents
-
-    @classmethod
-    def get_document_ids_from_database(cls) -> list[str]:
-        """Retrieves all the document IDs from the database."""
-        return [str(doc["_id"]) for doc in cls.get_documents_from_database()]
+        if "document_ids" not in cls._cache:
+            with mongodb_for_test_context() as client:
+                collection = cls.main_collection(client)
+                cls._cache["document_ids"] = [str(doc["_id"]) for doc in collection.find({}, projection={"_id": 1})]
+        return list(cls._cache["document_ids"])
 
     @classmethod
     def find_min_max_datetime(cls) -> dict[str, dict]:
         """Finds the minimum and the maximum for both the ``start_time`` and the ``end_time``.
 
-        We use `brute force` for this purpose. We set the minimum to a large value (year 2100) and the maximum to a
-        small value (year 1900). We then iterate through all documents and update the extrema.
+        The extrema are found by MongoDB itself. For each of the four extrema we sort the documents by the corresponding
+        field and retrieve only the ``_id`` and that field of the first document. The result is cached until the test
+        data is modified.
 
         Returns:
             A dictionary whose schema matches the response returned by the ``/datetime`` route of the API.
         """
-        result = dict(
-            start_time=dict(
-                _min=dict(_id=None, _time="2100-01-01T00:00:00"),
-                _max=dict(_id=None, _time="1900-01-01T00:00:00")
-            ),
-            end_time=dict(
-                _min=dict(_id=None, _time="2100-01-01T00:00:00"),
-                _max=dict(_id=None, _time="1900-01-01T00:00:00"))
-        )
-
-        documents = cls.get_documents_from_database()
-
-        for document in documents:
-            for k in ["start_time", "end_time"]:
-                dt = document[k].isoformat()
-                if dt > result[k]["_max"]["_time"]:
-                    result[k]["_max"]["_time"] = dt
-                    result[k]["_max"]["_id"] = str(document["_id"])
+        if "min_max_datetime" in cls._cache:
+            return deepcopy(cls._cache["min_max_datetime"])
 
-                if dt < result[k]["_min"]["_time"]:
-                    result[k]["_min"]["_time"] = dt
-                    result[k]["_min"]["_id"] = str(document["_id"])
+        result = dict()
+        with mongodb_for_test_context() as client:
+            collection = cls.main_collection(client)
+            for k in ["start_time", "end_time"]:
+                result[k] = dict()
+                for extremum, direction in [("_min", ASCENDING), ("_max", DESCENDING)]:
+                    document = collection.find_one({}, projection={k: 1}, sort=[(k, direction)])
+                    result[k][extremum] = dict(_id=str(document["_id"]), _time=document[k].isoformat())
 
-        return result
+        cls._cache["min_max_datetime"] = result
+        return deepcopy(result)
 
     @classmethod
-    def _query_platform_sensor(cls, document, platform=None, sensor=None) -> bool:
-        """An auxiliary method to the :func:`TestDatabase.match_query`."""
-        should_remove = False
-
-        if platform:
-            should_remove = platform and document["platform_name"] not in platform
-
-        if sensor and not should_remove:
-            should_remove = document["sensor"] not in sensor
+    def match_query(cls, platform=None, sensor=None, time_min=None, time_max=None) -> list[str]:
+        """Matches the given query.
 
-        return should_remove
+        The query is translated into a MongoDB filter and the matching is performed by MongoDB, which only returns the
+        IDs of the matching documents. When a query is ``None``, it does not have any effect on the results. This
+        method will be used in testing the ``/queries`` route of the API.
 
-    @classmethod
-    def _query_time(cls, document, time_min=None, time_max=None) -> bool:
-        """An auxiliary method to the :func:`TestDatabase.match_query`."""
-        should_remove = False
+        Note:
+            When both ``time_min`` and ``time_max`` are given, a document matches if its time interval overlaps with
+            ``[time_min, time_max]``. When only one of them is given, the ``end_time`` of the document is compared
+            against it.
 
-        if time_min and time_max and not should_remove:
-            should_remove = document["end_time"] < time_min or document["start_time"] > time_max
-
-        if time_min and not time_max and not should_remove:
-            should_remove = document["end_time"] < time_min
+        The results are cached per query until the test data is modified.
+        """
+        key = ("match_query", tuple(platform or ()), tuple(sensor or ()), time_min, time_max)
+        if key in cls._cache:
+            return list(cls._cache[key])
 
-        if time_max and not time_min and not should_remove:
-            should_remove = document["end_time"] > time_max
+        query = dict()
+        if platform:
+            query["platform_name"] = {"$in": platform}
+        if sensor:
+            query["sensor"] = {"$in": sensor}
+        if time_min:
+            query["end_time"] = {"$gte": time_min}
+        if time_max and time_min:
+            query["start_time"] = {"$lte": time_max}
+        if time_max and not time_min:
+            query["end_time"] = {"$lte": time_max}
 
-        return should_remove
+        with mongodb_for_test_context() as client:
+            collection = cls.main_collection(client)
+            cls._cache[key] = [str(document["_id"]) for document in collection.find(query, projection={"_id": 1})]
+        return list(cls._cache[key])
 
     @classmethod
-    def match_query(cls, platform=None, sensor=None, time_min=None, time_max=None) -> list[str]:
-        """Matches the given query.
+    def take_fingerprint(cls) -> tuple:
+        """Takes a fingerprint of the current state of the databases/collections.
 
-        We first take all the documents and then progressively remove all that do not match the given queries until
-        we end up with those that match. When a query is ``None``, it does not have any effect on the results.
-        This method will be used in testing the ``/queries`` route of the API.
+        Returns:
+            A tuple with one element per collection, i.e. the sorted IDs of its documents, or ``None`` if the
+            collection does not exist. Only the IDs are fetched, as the content of the test documents is never modified
+            in place by the tests.
         """
-        documents = cls.get_documents_from_database()
-
-        buffer = deepcopy(documents)
-        for document in documents:
-            should_remove = cls._query_platform_sensor(document, platform, sensor)
-            if not should_remove:
-                should_remove = cls._query_time(document, time_min, time_max)
-            if should_remove and document in buffer:
-                buffer.remove(document)
-
-        return [str(item["_id"]) for item in buffer]
+        with mongodb_for_test_context() as client:
+            return tuple(
+                sorted(str(doc["_id"]) for doc in client[db][coll].find({}, projection={"_id": 1}))
+                if coll in client[db].list_collection_names() else None
+                for db, coll in zip(cls.database_names, cls.collection_names, strict=True)
+            )
 
     @classmethod
     def prepare(cls) -> None:
-        """Prepares the MongoDB instance by first resetting the database and filling it with generated test data."""
+        """Prepares the MongoDB instance by first resetting the database and filling it with generated test data.
+
+        If the databases are still in the state left by the previous call, e.g. when several tests share the same
+        MongoDB instance, there is nothing to be done and the method returns early.
+        """
+        if cls._fingerprint is not None and cls._fingerprint == cls.take_fingerprint():
+            return
         cls.reset()
         cls.write_test_data()
+        cls._fingerprint = cls.take_fingerprint()
+
+    @classmethod
+    def restore(cls) -> None:
+        """Restores the databases/collections to the state as left by the last call to :func:`TestDatabase.prepare`.
+
+        Documents which have been added to the main collection since then are removed in a targeted manner, which is
+        much cheaper than regenerating and rewriting the test data. If that does not suffice, e.g. when some test data
+        has been deleted, the databases are prepared from scratch.
+        """
+        if cls._fingerprint is not None:
+            with mongodb_for_test_context() as client:
+                seeded_ids = [document["_id"] for document in cls.documents]
+                if cls.main_collection(client).delete_many({"_id": {"$nin": seeded_ids}}).deleted_count:
+                    cls._cache.clear()
+        cls.prepare()
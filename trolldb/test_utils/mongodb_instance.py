@@ -6,16 +6,31 @@ import tempfile
 import time
 from contextlib import contextmanager
 from os import mkdir, path
-from shutil import rmtree
+from shutil import disk_usage, rmtree, which
 from typing import Any, AnyStr, ClassVar, Generator, Optional
 
 from loguru import logger
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure, PyMongoError
 
 from trolldb.config.config import DatabaseConfig, Timeout
 from trolldb.test_utils.common import test_app_config
 from trolldb.test_utils.mongodb_database import TestDatabase
 
 
+def memory_backed_dir(min_free_bytes: int = 2**30) -> Optional[str]:
+    """Returns ``/dev/shm`` if it exists and has at least ``min_free_bytes`` of free space, otherwise ``None``.
+
+    The returned value can be passed to the ``dir`` argument of :func:`tempfile.mkdtemp`, so that the temp directory is
+    kept in memory if possible and falls back to the default location otherwise.
+    """
+    # We suppress ruff (S108) here as this is only used as the parent of a securely created temp directory.
+    shm = "/dev/shm"  # noqa: S108
+    if path.isdir(shm) and disk_usage(shm).free >= min_free_bytes:
+        return shm
+    return None
+
+
 class TestMongoInstance:
     """A static class to enclose functionalities for running a MongoDB instance."""
 
@@ -27,19 +42,23 @@ class TestMongoInstance:
         every time!
     """
 
-    storage_dir: ClassVar[str] = tempfile.mkdtemp("__pytroll_db_temp_test_storage")
+    storage_dir: ClassVar[str] = tempfile.mkdtemp("__pytroll_db_temp_test_storage", dir=memory_backed_dir())
     """Temp directory for storing database files by the MongoDB instance.
 
+    It is kept in memory, i.e. in ``/dev/shm``, if possible so that the writes of the instance never hit the disk.
+
     Warning:
         The value of this attribute as shown above is just an example and will change in an unpredictable (secure) way
         every time!
     """
 
-    port: ClassVar[int] = 28017
+    port: ClassVar[int] = test_app_config.database.url.hosts()[0]["port"]
     """The port on which the instance will run.
 
+    It is taken from the test configurations, which offset it per ``pytest-xdist`` worker.
+
     Warning:
-        This must be always hard-coded.
+        This must be always an integer which is determined by the test configurations and not received from outside.
     """
 
     process: ClassVar[Optional[subprocess.Popen]] = None
@@ -74,10 +93,12 @@ class TestMongoInstance:
     @classmethod
     def mongodb_exists(cls) -> bool:
         """Checks if ``mongod`` command exists."""
-        outs, errs = cls.run_subprocess(["which", "mongod"])
-        if outs and not errs:
-            return True
-        return False
+        return which("mongod") is not None
+
+    @classmethod
+    def is_running(cls) -> bool:
+        """Checks if the MongoDB instance has been started and is still running."""
+        return cls.process is not None and cls.process.poll() is None
 
     @classmethod
     def prepare_dirs(cls) -> None:
@@ -87,16 +108,61 @@ class TestMongoInstance:
 
     @classmethod
     def run_instance(cls) -> None:
-        """Runs the MongoDB instance and does not wait for it, i.e. the process runs in the background."""
+        """Runs the MongoDB instance and does not wait for it, i.e. the process runs in the background.
+
+        The WiredTiger cache is capped, as the test data is tiny and the default cache size is proportional to the RAM.
+        """
         cls.run_subprocess(
-            ["mongod", "--dbpath", cls.storage_dir, "--logpath", f"{cls.log_dir}/mongod.log", "--port", f"{cls.port}"]
+            ["mongod", "--dbpath", cls.storage_dir, "--logpath", f"{cls.log_dir}/mongod.log", "--port", f"{cls.port}",
+             "--quiet", "--wiredTigerCacheSizeGB", "0.25"]
             , wait=False)
 
+    @classmethod
+    def wait_until_ready(cls, url: str, startup_time: Timeout) -> bool:
+        """Waits until the MongoDB instance responds to a ``ping`` command, but not longer than ``startup_time``.
+
+        Args:
+            url:
+                The URL of the MongoDB instance.
+            startup_time:
+                The maximum time in seconds to wait for the instance.
+
+        Returns:
+            Whether the instance is ready to accept requests.
+        """
+        deadline = time.monotonic() + startup_time
+        while time.monotonic() < deadline:
+            try:
+                with MongoClient(url, serverSelectionTimeoutMS=100) as client:
+                    client.admin.command("ping")
+                return True
+            except ConnectionFailure:
+                time.sleep(0.05)
+        return False
+
     @classmethod
     def shutdown_instance(cls) -> None:
-        """Shuts down the MongoDB instance by terminating its process."""
-        cls.process.terminate()
-        cls.process.wait()
+        """Shuts down the MongoDB instance.
+
+        The instance is first asked to shut down gracefully via the ``shutdown`` admin command. If it has not exited
+        after a short while, its process is terminated, and eventually killed as a last resort.
+        """
+        try:
+            with MongoClient(f"mongodb://localhost:{cls.port}", serverSelectionTimeoutMS=500) as client:
+                client.admin.command("shutdown")
+        except PyMongoError:
+            # The instance drops the connection as it shuts down, hence an error is expected even on success.
+            pass
+
+        try:
+            cls.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            cls.process.terminate()
+            try:
+                cls.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                cls.process.kill()
+                cls.process.wait()
         for d in [cls.log_dir, cls.storage_dir]:
             cls.__remove_dir(d)
 
@@ -115,9 +181,23 @@ def mongodb_instance_server_process_context(
             The configuration of the database.
 
         startup_time:
-            The overall time in seconds that is expected for the MongoDB server instance to run before the database
-            content can be accessed.
+            The maximum time in seconds that is expected for the MongoDB server instance to run before the database
+            content can be accessed. The context manager yields as soon as the instance responds, which is usually
+            much sooner.
+
+    Note:
+        If an instance is already running on the same port, e.g. one which encloses the whole test session, it is
+        reused as is. In this case, the context manager neither starts nor shuts down any instance. If an instance is
+        running on a different port, an error is logged and the program exits, as only a single instance is supported.
     """
+    if TestMongoInstance.is_running():
+        port = database_config.url.hosts()[0]["port"]
+        if port != TestMongoInstance.port:
+            logger.error(f"A MongoDB instance is already running on port {TestMongoInstance.port}, not on {port}!")
+            sys.exit(errno.EIO)
+        yield
+        return
+
     TestMongoInstance.port = database_config.url.hosts()[0]["port"]
     TestMongoInstance.prepare_dirs()
 
@@ -127,7 +207,8 @@ def mongodb_instance_server_process_context(
 
     try:
         TestMongoInstance.run_instance()
-        time.sleep(startup_time)
+        if not TestMongoInstance.wait_until_ready(database_config.url.unicode_string(), startup_time):
+            logger.warning(f"The MongoDB instance did not respond within {startup_time} seconds!")
         yield
     finally:
         TestMongoInstance.shutdown_instance()
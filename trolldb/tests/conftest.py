@@ -3,19 +3,39 @@
 This module provides fixtures for running a Mongo DB instance in test mode and filling the database with test data.
 """
 
-from typing import Callable
+import asyncio
+from typing import Any, AsyncGenerator, Callable, Generator
+from uuid import uuid4
 
 import pytest
 import pytest_asyncio
 from _pytest.logging import LogCaptureFixture
 from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorClient
 
 from trolldb.database.mongodb import mongodb_context
 from trolldb.test_utils.common import test_app_config
-from trolldb.test_utils.mongodb_database import TestDatabase
+from trolldb.test_utils.mongodb_database import TestDatabase, mongodb_for_test_context
 from trolldb.test_utils.mongodb_instance import running_prepared_database_context
 
 
+def pytest_asyncio_loop_factories(config: pytest.Config, item: pytest.Item) -> dict[str, Callable]:
+    """Runs the async tests and fixtures on a `uvloop <https://uvloop.readthedocs.io/>`_ event loop, if available.
+
+    ``uvloop`` is optional as it is not available on all platforms, e.g. Windows. Without it, the default asyncio event
+    loop is used.
+
+    Warning:
+        This hook requires ``pytest-asyncio>=1.4``. Older versions do not define it, and pytest refuses to run with a
+        hook which it does not know.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return dict(asyncio=asyncio.new_event_loop)
+    return dict(uvloop=uvloop.new_event_loop)
+
+
 @pytest.fixture
 def caplog(caplog: LogCaptureFixture):
     """This overrides the actual pytest ``caplog`` fixture.
@@ -27,8 +47,9 @@ def caplog(caplog: LogCaptureFixture):
     handler_id = logger.add(
         caplog.handler,
         format="{message}",
-        level=0,
-        filter=lambda record: record["level"].no >= caplog.handler.level,
+        # The level is fixed when the sink is added, which lets loguru discard the records below it without calling a
+        # filter. Note that this does not honor ``caplog.set_level()`` calls which are made afterward.
+        level=caplog.handler.level,
         enqueue=False,  # Set to 'True' if your test is spawning child processes.
     )
     yield caplog
@@ -44,12 +65,47 @@ def _run_mongodb_server_instance():
 
 @pytest_asyncio.fixture()
 async def mongodb_fixture(_run_mongodb_server_instance):
-    """Fills the database with test data and then enclose each test in a mongodb context manager."""
-    TestDatabase.prepare()
+    """Restores the test data and then encloses each test in a mongodb context manager.
+
+    The test data is written only once per session, i.e. by ``_run_mongodb_server_instance``. Afterward, each test
+    only undoes the changes of the previous ones, if any.
+    """
+    TestDatabase.restore()
     async with mongodb_context(test_app_config.database):
         yield
 
 
+@pytest_asyncio.fixture(scope="session")
+async def motor_client(_run_mongodb_server_instance) -> AsyncGenerator[AsyncIOMotorClient, None]:
+    """Provides a motor client which is shared by all the tests in the session.
+
+    Unlike :class:`~trolldb.database.mongodb.MongoDB`, this client is independent of the code under test, so it is not
+    affected when e.g. the recorder opens and closes its own MongoDB context.
+    """
+    client = AsyncIOMotorClient(
+        test_app_config.database.url.unicode_string(),
+        serverSelectionTimeoutMS=test_app_config.database.timeout * 1000)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def leased_database_name(_run_mongodb_server_instance) -> Generator[str, Any, None]:
+    """Leases a uniquely named database to a single test and drops it afterward.
+
+    The database includes an empty collection named after the main collection, so that it can replace the main
+    database in the app configuration, e.g. via ``make_test_app_config_as_dict(database_name=...)``. Tests which write
+    into it are independent of the test data and of each other.
+    """
+    database_name = f"test_database_{uuid4().hex}"
+    with mongodb_for_test_context() as client:
+        TestDatabase.create_indexes(
+            client[database_name].create_collection(test_app_config.database.main_collection_name))
+    yield database_name
+    with mongodb_for_test_context() as client:
+        client.drop_database(database_name)
+
+
 @pytest.fixture
 def check_log(caplog) -> Callable:
     """A fixture to check the logs. It relies on the ``caplog`` fixture.
@@ -59,10 +115,10 @@ def check_log(caplog) -> Callable:
     """
 
     def check_log_message_at_level(level: str, message: str) -> bool:
-        """An auxiliary function to check the log level and message."""
-        for rec in caplog.records:
-            if rec.levelname == level and (message in rec.message):
-                return True
-        return False
+        """An auxiliary function to check the log level and message.
+
+        The records are checked from the most recent one, as the message to look for has usually been logged last.
+        """
+        return any(rec.levelname == level and message in rec.message for rec in reversed(caplog.records))
 
     return check_log_message_at_level
@@ -1,6 +1,9 @@
 """Tests for the message recording into database."""
 
+from string import Template
+
 import pytest
+from motor.motor_asyncio import AsyncIOMotorCollection
 from posttroll.message import Message
 from posttroll.testing import patched_subscriber_recv
 from pytest_lazy_fixtures import lf
@@ -11,128 +14,142 @@ from trolldb.cli import (
     record_messages_from_command_line,
     record_messages_from_config,
 )
-from trolldb.database.mongodb import MongoDB, mongodb_context
 from trolldb.test_utils.common import AppConfig, create_config_file, make_test_app_config_as_dict, test_app_config
-from trolldb.test_utils.mongodb_instance import running_prepared_database_context
 
+pytestmark = pytest.mark.usefixtures("_run_mongodb_server_instance")
 
-@pytest.fixture
+
+message_template = Template(
+    "pytroll://$subject $type a001673@c20969.ad.smhi.se 2019-11-05T13:00:10.366023 v1.01 "
+    'application/json {"platform_name": "S1B", "scan_mode": "EW", "type": "GRDM", "data_source": "1SDH", '
+    '"start_time": "2019-11-03T15:39:36.543000", "end_time": "2019-11-03T15:40:40.821000", "orbit_number": '
+    '18765, "random_string1": "0235EA", "random_string2": "747D", $location, '
+    '"polarization": "hh", "sensor": "sar-c", "format": "GeoTIFF", "pass_direction": "ASCENDING"}')
+"""The template of the file, dataset, and delete messages, which only differ in their subject, type, and location."""
+
+
+@pytest.fixture(scope="module")
 def file_message(tmp_data_filename):
     """Create a string for a file message."""
-    return ('pytroll://segment/raster/L2/SAR file a001673@c20969.ad.smhi.se 2019-11-05T13:00:10.366023 v1.01 '
-            'application/json {"platform_name": "S1B", "scan_mode": "EW", "type": "GRDM", "data_source": "1SDH", '
-            '"start_time": "2019-11-03T15:39:36.543000", "end_time": "2019-11-03T15:40:40.821000", "orbit_number": '
-            '18765, "random_string1": "0235EA", "random_string2": "747D", "uri": '
-            f'"{str(tmp_data_filename)}", "uid": "20191103_153936-s1b-ew-hh.tiff", '
-            '"polarization": "hh", "sensor": "sar-c", "format": "GeoTIFF", "pass_direction": "ASCENDING"}')
+    return message_template.substitute(
+        subject="segment/raster/L2/SAR", type="file",
+        location=f'"uri": "{tmp_data_filename}", "uid": "20191103_153936-s1b-ew-hh.tiff"')
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def dataset_message(tmp_data_filename):
     """Create a string for a file message."""
-    return ('pytroll://segment/raster/L2/SAR dataset a001673@c20969.ad.smhi.se 2019-11-05T13:00:10.366023 v1.01 '
-            'application/json {"platform_name": "S1B", "scan_mode": "EW", "type": "GRDM", "data_source": "1SDH", '
-            '"start_time": "2019-11-03T15:39:36.543000", "end_time": "2019-11-03T15:40:40.821000", "orbit_number": '
-            '18765, "random_string1": "0235EA", "random_string2": "747D", "dataset": [{"uri": '
-            f'"{str(tmp_data_filename)}", "uid": "20191103_153936-s1b-ew-hh.tiff"}}], '
-            '"polarization": "hh", "sensor": "sar-c", "format": "GeoTIFF", "pass_direction": "ASCENDING"}')
+    return message_template.substitute(
+        subject="segment/raster/L2/SAR", type="dataset",
+        location=f'"dataset": [{{"uri": "{tmp_data_filename}", "uid": "20191103_153936-s1b-ew-hh.tiff"}}]')
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def del_message(tmp_data_filename):
     """Create a string for a delete message."""
-    return ('pytroll://deletion del a001673@c20969.ad.smhi.se 2019-11-05T13:00:10.366023 v1.01 '
-            'application/json {"platform_name": "S1B", "scan_mode": "EW", "type": "GRDM", "data_source": "1SDH", '
-            '"start_time": "2019-11-03T15:39:36.543000", "end_time": "2019-11-03T15:40:40.821000", "orbit_number": '
-            '18765, "random_string1": "0235EA", "random_string2": "747D", "uri": '
-            f'"{str(tmp_data_filename)}", "uid": "20191103_153936-s1b-ew-hh.tiff", '
-            '"polarization": "hh", "sensor": "sar-c", "format": "GeoTIFF", "pass_direction": "ASCENDING"}')
+    return message_template.substitute(
+        subject="deletion", type="del",
+        location=f'"uri": "{tmp_data_filename}", "uid": "20191103_153936-s1b-ew-hh.tiff"')
 
 
-@pytest.fixture
-def unknown_message(tmp_data_filename):
+@pytest.fixture(scope="module")
+def unknown_message():
     """Create a string for an unknown message."""
     return ("pytroll://deletion some_unknown_key a001673@c20969.ad.smhi.se 2019-11-05T13:00:10.366023 v1.01 "
             "application/json {}")
 
 
-@pytest.fixture
-def tmp_data_filename(tmp_path):
-    """Create a filename for the messages."""
+@pytest.fixture(scope="module")
+def file_message_decoded(file_message):
+    """The decoded file message, which is shared by all tests in the module."""
+    return Message.decode(file_message)
+
+
+@pytest.fixture(scope="module")
+def dataset_message_decoded(dataset_message):
+    """The decoded dataset message, which is shared by all tests in the module."""
+    return Message.decode(dataset_message)
+
+
+@pytest.fixture(scope="module")
+def tmp_data_filename(tmp_path_factory):
+    """Create a filename for the messages.
+
+    The filename is the same for all tests in the module, so that the messages only need to be created once.
+    """
     filename = "20191103_153936-s1b-ew-hh.tiff"
-    return tmp_path / filename
+    return tmp_path_factory.mktemp("data") / filename
+
+
+@pytest.fixture
+def leased_collection(motor_client, leased_database_name) -> AsyncIOMotorCollection:
+    """The main collection of the leased database, accessed via the shared motor client."""
+    return motor_client[leased_database_name][test_app_config.database.main_collection_name]
+
+
+@pytest.fixture
+def app_config(tmp_path, leased_database_name):
+    """A fixture to create the app configuration for the tests."""
+    return AppConfig(**make_test_app_config_as_dict(tmp_path, leased_database_name))
 
 
 @pytest.fixture
-def config_file(tmp_path):
+def config_file(tmp_path, leased_database_name):
     """A fixture to create a config file for the tests."""
-    return create_config_file(tmp_path)
+    return create_config_file(tmp_path, leased_database_name)
 
 
 @pytest.mark.parametrize(("function", "args"), [
     (record_messages_from_config, lf("config_file")),
     (record_messages_from_command_line, [lf("config_file")])
 ])
-async def test_record_from_cli_and_config(tmp_path, file_message, tmp_data_filename, function, args):
+async def test_record_from_cli_and_config(file_message, file_message_decoded, leased_collection, function, args):
     """Tests that message recording adds a message to the database either via configs from a file or the CLI."""
-    msg = Message.decode(file_message)
-    with running_prepared_database_context():
-        with patched_subscriber_recv([file_message]):
-            await function(args)
-            assert await message_in_database_and_delete_count_is_one(msg)
-
-
-async def message_in_database_and_delete_count_is_one(msg: Message) -> bool:
-    """Checks if there is exactly one item in the database which matches the data of the message."""
-    async with mongodb_context(test_app_config.database):
-        collection = await MongoDB.get_collection("test_database", "test_collection")
-        result = await collection.find_one(dict(scan_mode="EW"))
-        result.pop("_id")
-        uri = msg.data.get("uri")
-        if not uri:
-            uri = msg.data["dataset"][0]["uri"]
-        deletion_count = await delete_uri_from_collection(collection, uri)
-
-        return result == msg.data and deletion_count == 1
-
-
-async def test_record_messages(config_file, tmp_path, file_message, tmp_data_filename):
-    """Tests that message recording adds a message to the database."""
-    config = AppConfig(**make_test_app_config_as_dict(tmp_path))
-    msg = Message.decode(file_message)
-    with running_prepared_database_context():
-        with patched_subscriber_recv([file_message]):
-            await record_messages(config)
-            assert await message_in_database_and_delete_count_is_one(msg)
-
-
-async def test_record_deletes_message(tmp_path, file_message, del_message):
-    """Tests that message recording can delete a record in the database."""
-    config = AppConfig(**make_test_app_config_as_dict(tmp_path))
-    with running_prepared_database_context():
-        with patched_subscriber_recv([file_message, del_message]):
-            await record_messages(config)
-            async with mongodb_context(config.database):
-                collection = await MongoDB.get_collection("test_database", "test_collection")
-                result = await collection.find_one(dict(scan_mode="EW"))
-                assert result is None
-
-
-async def test_record_dataset_messages(tmp_path, dataset_message):
-    """Tests recording a dataset message and deleting the file."""
-    config = AppConfig(**make_test_app_config_as_dict(tmp_path))
-    msg = Message.decode(dataset_message)
-    with running_prepared_database_context():
-        with patched_subscriber_recv([dataset_message]):
-            await record_messages(config)
-            assert await message_in_database_and_delete_count_is_one(msg)
-
-
-async def test_unknown_messages(check_log, tmp_path, unknown_message):
+    with patched_subscriber_recv([file_message]):
+        await function(args)
+        assert await message_in_database_and_delete_count_is_one(file_message_decoded, leased_collection)
+
+
+async def message_in_database_and_delete_count_is_one(msg: Message, collection: AsyncIOMotorCollection) -> bool:
+    """Checks if there is exactly one item in the given collection which matches the data of the message."""
+    result = await collection.find_one(dict(scan_mode="EW"))
+    result.pop("_id")
+    uri = msg.data.get("uri")
+    if not uri:
+        uri = msg.data["dataset"][0]["uri"]
+    deletion_count = await delete_uri_from_collection(collection, uri)
+
+    return result == msg.data and deletion_count == 1
+
+
+@pytest.mark.parametrize("decoded", [False, True], ids=["string", "message"])
+@pytest.mark.parametrize(("messages", "expected", "expected_log"), [
+    ([lf("file_message")], lf("file_message_decoded"), "Inserted file with uri"),
+    ([lf("dataset_message")], lf("dataset_message_decoded"), "Inserted dataset with 1 elements"),
+    ([lf("file_message"), lf("del_message")], None, "Inserted file with uri"),
+])
+async def test_record_messages(check_log, app_config, leased_collection, messages, expected, expected_log, decoded):
+    """Tests that message recording adds file and dataset messages to the database and deletes them upon request.
+
+    The ``expected`` message is the one which must be in the database after recording, or ``None`` if the database must
+    not include any message. The messages are received either as strings or, like from an actual subscriber, as
+    decoded messages. The latter are decoded anew for each test, as inserting a message into the database adds the
+    ``_id`` to its data.
+    """
+    if decoded:
+        messages = [Message.decode(m) for m in messages]
+    with patched_subscriber_recv(messages):
+        await record_messages(app_config)
+    assert check_log("INFO", expected_log)
+    if expected is None:
+        assert await leased_collection.find_one(dict(scan_mode="EW")) is None
+    else:
+        assert await message_in_database_and_delete_count_is_one(expected, leased_collection)
+
+
+async def test_unknown_messages(check_log, app_config, unknown_message):
     """Tests that we identify the message as being unknown, and we log that."""
-    config = AppConfig(**make_test_app_config_as_dict(tmp_path))
-    with running_prepared_database_context():
-        with patched_subscriber_recv([unknown_message]):
-            await record_messages(config)
+    with patched_subscriber_recv([unknown_message]):
+        await record_messages(app_config)
 
     assert check_log("DEBUG", "Don't know what to do with some_unknown_key message")
@@ -6,7 +6,7 @@ Note:
     will be sent to the API and the results will be asserted against expectations.
 """
 
-from collections import Counter
+import asyncio
 from datetime import datetime
 
 import pytest
@@ -26,16 +26,25 @@ main_database_name = test_app_config.database.main_database_name
 main_collection_name = test_app_config.database.main_collection_name
 
 
-@pytest_asyncio.fixture()
-async def server_client():
-    """A fixture to enclose the server async client context manager and start a prepared database.
+@pytest_asyncio.fixture(scope="module")
+async def _api_mongodb_context(_run_mongodb_server_instance):
+    """Encloses all tests of the module in a single mongodb context manager, using the session MongoDB instance."""
+    async with mongodb_context(test_app_config.database):
+        yield
 
-    TODO: this needs to be optimized so that the database is not closed and reopened for each test!
-    """
-    with running_prepared_database_context():
-        async with mongodb_context(test_app_config.database):
-            async with AsyncClient(transport=ASGITransport(app=fastapi_app), base_url="http://localhost") as ac:
-                yield ac
+
+@pytest_asyncio.fixture(scope="module")
+async def _api_client(_api_mongodb_context):
+    """Encloses all tests of the module in a single server async client context manager."""
+    async with AsyncClient(transport=ASGITransport(app=fastapi_app), base_url="http://localhost") as ac:
+        yield ac
+
+
+@pytest.fixture
+def server_client(_api_client):
+    """A fixture to provide the shared server async client, after restoring the test data if need be."""
+    TestDatabase.restore()
+    return _api_client
 
 
 async def test_root(server_client):
@@ -45,20 +54,20 @@ async def test_root(server_client):
 
 async def test_platforms(server_client):
     """Checks that the retrieved platform names match the expected names."""
-    assert set((await server_client.get("/platforms")).json()) == set(TestDatabase.platform_names)
+    assert set((await server_client.get("/platforms")).json()) == set(TestDatabase.platform_names())
 
 
 async def test_sensors(server_client):
     """Checks that the retrieved sensor names match the expected names."""
-    assert set((await server_client.get("/sensors")).json()) == set(TestDatabase.sensors)
+    assert set((await server_client.get("/sensors")).json()) == set(TestDatabase.sensors())
 
 
 async def test_database_names(server_client):
     """Checks that the retrieved database names match the expected names."""
-    assert Counter((await server_client.get("/databases")).json()) == Counter(TestDatabase.database_names)
-    assert Counter((await server_client.get("/databases?exclude_defaults=True")).json()) == Counter(
+    assert sorted((await server_client.get("/databases")).json()) == sorted(TestDatabase.database_names)
+    assert sorted((await server_client.get("/databases?exclude_defaults=True")).json()) == sorted(
         TestDatabase.database_names)
-    assert Counter((await server_client.get("/databases?exclude_defaults=False")).json()) == Counter(
+    assert sorted((await server_client.get("/databases?exclude_defaults=False")).json()) == sorted(
         TestDatabase.all_database_names)
 
 
@@ -69,27 +78,40 @@ async def test_database_names_negative(server_client):
 
 async def test_collections(server_client):
     """Checks the presence of existing collections and that the ids of documents therein can be correctly retrieved."""
-    with mongodb_for_test_context() as client:
+    assert all(await asyncio.gather(*(
+        collection_is_correct(server_client, database_name, collection_name)
         for database_name, collection_name in zip(TestDatabase.database_names, TestDatabase.collection_names,
-                                                  strict=False):
-            assert collections_exists(
-                (await server_client.get(f"databases/{database_name}")).json(),
-                [collection_name]
-            )
-            assert document_ids_are_correct(
-                (await server_client.get(f"databases/{database_name}/{collection_name}")).json(),
-                [str(doc["_id"]) for doc in client[database_name][collection_name].find({})]
-            )
+                                                  strict=False)
+    )))
+
+
+async def collection_is_correct(server_client: AsyncClient, database_name: str, collection_name: str) -> bool:
+    """Checks that the collection exists in the database and that the ids of its documents are retrieved correctly."""
+    databases_response, collection_response, expected_ids = await asyncio.gather(
+        server_client.get(f"databases/{database_name}"),
+        server_client.get(f"databases/{database_name}/{collection_name}"),
+        asyncio.to_thread(document_ids_in_collection, database_name, collection_name)
+    )
+    return (
+            collections_exists(databases_response.json(), [collection_name]) and
+            document_ids_are_correct(collection_response.json(), expected_ids)
+    )
+
+
+def document_ids_in_collection(database_name: str, collection_name: str) -> list[str]:
+    """Retrieves the ids of all documents in the collection directly from the database, using the shared test client."""
+    with mongodb_for_test_context() as client:
+        return [str(_id) for _id in client[database_name][collection_name].distinct("_id")]
 
 
 def collections_exists(test_collection_names: list[str], expected_collection_name: list[str]) -> bool:
     """Checks if the test and expected list of collection names match."""
-    return Counter(test_collection_names) == Counter(expected_collection_name)
+    return sorted(test_collection_names) == sorted(expected_collection_name)
 
 
 def document_ids_are_correct(test_ids: list[str], expected_ids: list[str]) -> bool:
     """Checks if the test (retrieved from the API) and expected list of (document) ids match."""
-    return Counter(test_ids) == Counter(expected_ids)
+    return sorted(test_ids) == sorted(expected_ids)
 
 
 async def test_collections_negative(server_client):
@@ -112,29 +134,18 @@ async def test_queries_all(server_client):
     )
 
 
-@pytest.mark.parametrize(("key", "values"), [
-    ("platform", TestDatabase.unique_platform_names),
-    ("sensor", TestDatabase.unique_sensors)
+@pytest.mark.parametrize(("key", "number_of_values"), [
+    *(("platform", i) for i in range(len(TestDatabase.unique_platform_names) + 1)),
+    *(("sensor", i) for i in range(len(TestDatabase.unique_sensors) + 1))
 ])
-async def test_queries_platform_or_sensor(server_client, key: str, values: list[str]):
+async def test_queries_platform_or_sensor(server_client, key: str, number_of_values: int):
     """Tests the platform and sensor queries, one at a time.
 
-    There is only a single key in the query, but it has multiple corresponding values.
+    There is only a single key in the query, but it has multiple corresponding values, i.e. the first
+    ``number_of_values`` ones of all the possible values for the key.
     """
-    for i in range(len(values)):
-        assert await query_results_are_correct(
-            server_client,
-            [key],
-            [values[:i]]
-        )
-
-
-def make_query_string(keys: list[str], values_list: list[list[str] | datetime]) -> str:
-    """Makes a single query string for all the given queries."""
-    query_buffer = []
-    for key, value_list in zip(keys, values_list, strict=True):
-        query_buffer += [f"{key}={value}" for value in value_list]
-    return "&".join(query_buffer)
+    values = dict(platform=TestDatabase.unique_platform_names, sensor=TestDatabase.unique_sensors)[key]
+    assert await query_results_are_correct(server_client, [key], [values[:number_of_values]])
 
 
 async def query_results_are_correct(server_client: AsyncClient, keys: list[str],
@@ -157,24 +168,29 @@ async def query_results_are_correct(server_client: AsyncClient, keys: list[str],
     Returns:
         A boolean flag indicating whether the retrieved result matches the expected result.
     """
-    query_string = make_query_string(keys, values_list)
-
-    return (
-            Counter((await server_client.get(f"queries?{query_string}")).json()) ==
-            Counter(TestDatabase.match_query(
-                **{label: value_list for label, value_list in zip(keys, values_list, strict=True)}
-            ))
+    params = [(key, value) for key, value_list in zip(keys, values_list, strict=True) for value in value_list]
+
+    # The expected result is retrieved via a blocking client, hence in a separate thread so that it can overlap with
+    # the API call, as well as with the other queries which are being checked concurrently.
+    response, expected = await asyncio.gather(
+        server_client.get("queries", params=params),
+        asyncio.to_thread(
+            TestDatabase.match_query, **{label: value_list for label, value_list in zip(keys, values_list, strict=True)}
+        )
     )
+    return sorted(response.json()) == sorted(expected)
 
 
 async def test_queries_mix_platform_sensor(server_client):
     """Tests a mix of platform and sensor queries."""
-    for n_plt, n_sns in zip([1, 1, 2, 3, 3], [1, 3, 2, 1, 3], strict=False):
-        assert await query_results_are_correct(
+    assert all(await asyncio.gather(*(
+        query_results_are_correct(
             server_client,
             ["platform", "sensor"],
             [TestDatabase.unique_platform_names[:n_plt], TestDatabase.unique_sensors[:n_sns]]
         )
+        for n_plt, n_sns in zip([1, 1, 2, 3, 3], [1, 3, 2, 1, 3], strict=False)
+    )))
 
 
 async def test_queries_time(server_client):
@@ -183,25 +199,22 @@ async def test_queries_time(server_client):
     time_min = datetime.fromisoformat(res["start_time"]["_min"]["_time"])
     time_max = datetime.fromisoformat(res["end_time"]["_max"]["_time"])
 
-    assert await single_query_is_correct(
-        server_client,
-        "time_min",
-        time_min
-    )
-
-    assert await single_query_is_correct(
-        server_client,
-        "time_max",
-        time_max
+    # The two queries are independent of each other, hence they are sent concurrently.
+    time_min_is_correct, time_max_is_correct = await asyncio.gather(
+        single_query_is_correct(server_client, "time_min", time_min),
+        single_query_is_correct(server_client, "time_max", time_max)
     )
+    assert time_min_is_correct
+    assert time_max_is_correct
 
 
-async def single_query_is_correct(server_client: AsyncClient, key: str, value: str | datetime) -> bool:
+async def single_query_is_correct(server_client: AsyncClient, key: str, value: datetime) -> bool:
     """Checks if the given single query, denoted by ``key`` matches correctly against the ``value``."""
-    return (
-            Counter((await server_client.get(f"queries?{key}={value}")).json()) ==
-            Counter(TestDatabase.match_query(**{key: value}))
+    response, expected = await asyncio.gather(
+        server_client.get("queries", params={key: value.isoformat()}),
+        asyncio.to_thread(TestDatabase.match_query, **{key: value})
     )
+    return sorted(response.json()) == sorted(expected)
 
 
 async def test_get_distinct_items_in_collection():
@@ -214,17 +227,22 @@ async def test_get_distinct_items_in_collection():
 
 async def test_document_by_id(server_client):
     """Tests that one can query the documents by their IDs."""
-    for _id, doc in zip(TestDatabase.get_document_ids_from_database(), TestDatabase.documents, strict=False):
-        doc["_id"] = _id
-        doc["end_time"] = doc["end_time"].isoformat()
-        doc["start_time"] = doc["start_time"].isoformat()
-        assert (await server_client.get(f"databases/{main_database_name}/{main_collection_name}/{_id}")).json() == doc
+    ids = TestDatabase.get_document_ids_from_database()
+    responses = await asyncio.gather(*(
+        server_client.get(f"databases/{main_database_name}/{main_collection_name}/{_id}") for _id in ids
+    ))
+    for _id, doc, res in zip(ids, TestDatabase.documents, responses, strict=False):
+        # The test documents are shared between tests, hence we must not modify them in place.
+        doc = doc | dict(_id=_id, end_time=doc["end_time"].isoformat(), start_time=doc["start_time"].isoformat())
+        assert res.json() == doc
 
 
 async def test_document_by_id_negative(server_client):
     """Tests that we do not allow invalid IDs."""
-    for _id in ["1", "1" * 25]:
-        res = await server_client.get(f"databases/{main_database_name}/{main_collection_name}/{_id}")
+    responses = await asyncio.gather(*(
+        server_client.get(f"databases/{main_database_name}/{main_collection_name}/{_id}") for _id in ["1", "1" * 25]
+    ))
+    for res in responses:
         assert (res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY)
         assert "Value error" in res.json()["detail"][0]["msg"]
 
@@ -239,6 +257,7 @@ async def test_document_by_id_not_found(server_client):
     assert (res.text == msg)
 
 
+@pytest.mark.integration
 def test_run_server():
     """Tests the ``run_server`` function by starting a running API server + MongoDB and a request to the '/' route."""
     with running_prepared_database_context():
@@ -15,13 +15,14 @@ def test_id_must_be_valid_bad_types(id_string):
         id_must_be_valid(id_string)
 
 
-def test_id_must_be_valid_bad_values():
+@pytest.mark.parametrize("number_of_chars", [
+    *range(1, 24), *range(25, 30)
+])
+def test_id_must_be_valid_bad_values(number_of_chars):
     """Tests that we fail to generate a valid ObjectId with wrong input values."""
-    number_of_chars = list(range(1, 24)) + list(range(25, 30))
-    for i in number_of_chars:
-        id_string = "0" * i
-        with pytest.raises(ValueError, match=id_string):
-            id_must_be_valid(id_string)
+    id_string = "0" * number_of_chars
+    with pytest.raises(ValueError, match=id_string):
+        id_must_be_valid(id_string)
 
 
 @pytest.mark.parametrize("id_string", [
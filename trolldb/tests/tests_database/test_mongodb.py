@@ -8,7 +8,6 @@ Note:
 
 import errno
 import time
-from collections import Counter
 
 import pytest
 from bson import ObjectId
@@ -19,21 +18,32 @@ from trolldb.database.mongodb import DatabaseConfig, MongoDB, get_id, get_ids, m
 from trolldb.test_utils.common import make_test_app_config_as_dict, test_app_config
 from trolldb.test_utils.mongodb_database import TestDatabase
 
+main_database_name: str = test_app_config.database.main_database_name
+"""The name of the main database as given in the test configuration."""
+
+main_collection_name: str = test_app_config.database.main_collection_name
+"""The name of the main collection as given in the test configuration."""
+
 
 async def test_connection_timeout_negative(check_log):
-    """Tests that the connection attempt times out after the expected time, since the MongoDB URL is invalid."""
+    """Tests that the connection attempt times out after the expected time, since no MongoDB listens on the URL.
+
+    Note:
+        The URL points to a closed port on the local host, so that the connection is refused immediately, without any
+        DNS lookup. The client keeps retrying until the timeout, which can thus be kept short.
+    """
     invalid_config = DatabaseConfig(
-        url=MongoDsn("mongodb://invalid_url_that_does_not_exist:8000"),
-        timeout=3,
-        main_database_name=test_app_config.database.main_database_name,
-        main_collection_name=test_app_config.database.main_collection_name,
+        url=MongoDsn("mongodb://127.0.0.1:1"),
+        timeout=0.3,
+        main_database_name=main_database_name,
+        main_collection_name=main_collection_name,
     )
 
-    t1 = time.time()
+    t1 = time.monotonic()
     with pytest.raises(SystemExit) as exc:
         async with mongodb_context(invalid_config):
             pass
-    t2 = time.time()
+    t2 = time.monotonic()
 
     assert exc.value.code == errno.EIO
     assert check_log("ERROR", Client.ConnectionError.get_error_details()[1])
@@ -42,10 +52,10 @@ async def test_connection_timeout_negative(check_log):
 
 @pytest.mark.parametrize(("error", "invalid_config"), [(
         Collections.NotFoundError,
-        dict(main_database_name=test_app_config.database.main_database_name, main_collection_name=" ")),
+        dict(main_database_name=main_database_name, main_collection_name=" ")),
     (
             Databases.NotFoundError,
-            dict(main_database_name=" ", main_collection_name=test_app_config.database.main_collection_name))
+            dict(main_database_name=" ", main_collection_name=main_collection_name))
 ])
 @pytest.mark.usefixtures("_run_mongodb_server_instance")
 async def test_main_database_and_collection_negative(check_log, error, invalid_config):
@@ -117,18 +127,18 @@ async def test_main_collection():
     - It is the same object that can be accessed via the `client` object of the MongoDB.
     """
     assert MongoDB.main_collection() is not None
-    assert MongoDB.main_collection().name == test_app_config.database.main_collection_name
+    assert MongoDB.main_collection().name == main_collection_name
     assert MongoDB.main_collection() == \
-           (await MongoDB.get_database(test_app_config.database.main_database_name))[
-               test_app_config.database.main_collection_name]
+           (await MongoDB.get_database(main_database_name))[
+               main_collection_name]
 
 
 @pytest.mark.usefixtures("mongodb_fixture")
 async def test_main_database():
     """Same as ``test_main_collection()`` but for the main database."""
     assert MongoDB.main_database() is not None
-    assert MongoDB.main_database().name == test_app_config.database.main_database_name
-    assert MongoDB.main_database() == await MongoDB.get_database(test_app_config.database.main_database_name)
+    assert MongoDB.main_database().name == main_database_name
+    assert MongoDB.main_database() == await MongoDB.get_database(main_database_name)
 
 
 @pytest.mark.usefixtures("mongodb_fixture")
@@ -136,7 +146,7 @@ async def test_get_database(check_log):
     """Tests the ``get_database()`` method given different inputs."""
     assert await MongoDB.get_database(None) == MongoDB.main_database()
     assert await MongoDB.get_database() == MongoDB.main_database()
-    assert await MongoDB.get_database(test_app_config.database.main_database_name) == MongoDB.main_database()
+    assert await MongoDB.get_database(main_database_name) == MongoDB.main_database()
 
 
 @pytest.mark.usefixtures("mongodb_fixture")
@@ -146,22 +156,26 @@ async def test_get_collection(check_log):
     assert await MongoDB.get_collection() == MongoDB.main_collection()
 
     collection = await MongoDB.get_collection(
-        test_app_config.database.main_database_name,
-        test_app_config.database.main_collection_name
+        main_database_name,
+        main_collection_name
     )
     assert collection == MongoDB.main_collection()
 
 
 @pytest.mark.usefixtures("mongodb_fixture")
 async def test_get_id():
-    """Tests :func:`trolldb.database.mongodb.get_id` using all documents (one at a time)."""
-    for _id in TestDatabase.get_document_ids_from_database():
-        doc = MongoDB.main_collection().find_one({"_id": ObjectId(_id)})
-        assert await get_id(doc) == _id
+    """Tests :func:`trolldb.database.mongodb.get_id` using a single document.
+
+    Note:
+        Retrieving the ids of all documents is covered by :func:`test_get_ids` in one pass, so that we do not need a
+        separate round trip to the database per document here.
+    """
+    _id = TestDatabase.get_document_ids_from_database()[0]
+    assert await get_id(MongoDB.main_collection().find_one({"_id": ObjectId(_id)}, projection={"_id": 1})) == _id
 
 
 @pytest.mark.usefixtures("mongodb_fixture")
 async def test_get_ids():
     """Tests :func:`trolldb.database.mongodb.get_ids` using all documents in one pass."""
-    docs = MongoDB.main_collection().find({})
-    assert Counter(await get_ids(docs)) == Counter(TestDatabase.get_document_ids_from_database())
+    docs = MongoDB.main_collection().find({}, projection={"_id": 1})
+    assert sorted(await get_ids(docs)) == sorted(TestDatabase.get_document_ids_from_database())
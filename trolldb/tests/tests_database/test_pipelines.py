@@ -1,4 +1,7 @@
 """Tests for the pipelines and applying comparison operations on them."""
+
+import pytest
+
 from trolldb.database.pipelines import PipelineAttribute, PipelineBooleanDict, Pipelines
 from trolldb.test_utils.common import compare_by_operator_name
 
@@ -17,20 +20,34 @@ def test_pipeline_boolean_dict():
     assert pd_or == pd_or_literal
 
 
-def test_pipeline_attribute():
+def test_pipeline_boolean_dict_flat_chain():
+    """Checks that chaining the same operator does not nest the pipeline boolean dicts, while mixing operators does."""
+    pd1 = PipelineBooleanDict({"number": 2})
+    pd2 = PipelineBooleanDict({"kind": 1})
+    pd3 = PipelineBooleanDict({"size": 3})
+
+    assert pd1 & pd2 & pd3 == PipelineBooleanDict({"$and": [{"number": 2}, {"kind": 1}, {"size": 3}]})
+    assert pd1 & (pd2 & pd3) == PipelineBooleanDict({"$and": [{"number": 2}, {"kind": 1}, {"size": 3}]})
+    assert pd1 | pd2 | pd3 == PipelineBooleanDict({"$or": [{"number": 2}, {"kind": 1}, {"size": 3}]})
+    assert (pd1 | pd2) & pd3 == PipelineBooleanDict({"$and": [{"$or": [{"number": 2}, {"kind": 1}]}, {"size": 3}]})
+
+
+@pytest.mark.parametrize("op", [
+    "$eq", "$gte", "$gt", "$lte", "$lt"
+])
+def test_pipeline_attribute(op):
     """Tests different comparison operators for a pipeline attribute in a list and as a single item."""
-    for op in ["$eq", "$gte", "$gt", "$lte", "$lt"]:
-        assert (
-                compare_by_operator_name(op, PipelineAttribute("letter"), "A") ==
-                PipelineBooleanDict({"letter": {op: "A"}} if op != "$eq" else {"letter": "A"})
-        )
-        assert (
-                compare_by_operator_name(op, PipelineAttribute("letter"), ["A", "B"]) ==
-                PipelineBooleanDict({"$or": [
-                    {"letter": {op: "A"} if op != "$eq" else "A"},
-                    {"letter": {op: "B"} if op != "$eq" else "B"}
-                ]})
-        )
+    assert (
+            compare_by_operator_name(op, PipelineAttribute("letter"), "A") ==
+            PipelineBooleanDict({"letter": {op: "A"}} if op != "$eq" else {"letter": "A"})
+    )
+    assert (
+            compare_by_operator_name(op, PipelineAttribute("letter"), ["A", "B"]) ==
+            PipelineBooleanDict({"$or": [
+                {"letter": {op: "A"} if op != "$eq" else "A"},
+                {"letter": {op: "B"} if op != "$eq" else "B"}
+            ]})
+    )
 
 
 def test_pipelines():